@@ -4,222 +4,447 @@ Simple HTTP Server for AutomationService Backend
 This simulates the Node.js backend for demonstration
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
 import urllib.parse
 import hashlib
+import hmac
 import datetime
+import time
 import sqlite3
+import threading
+import asyncio
+import queue
+import sys
 import os
 
+import bcrypt
+import msgspec
+import uvicorn
+
+# Log lines are queued by request handlers and written by one background
+# thread, so handlers never block on stdout
+LOG_QUEUE = queue.SimpleQueue()
+
+def log_writer():
+    """Drain queued log lines to stdout in batches"""
+    while True:
+        batch = [LOG_QUEUE.get()]
+        while len(batch) < 256:
+            try:
+                batch.append(LOG_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        sys.stdout.buffer.write(b''.join(batch))
+        sys.stdout.flush()
+
+threading.Thread(target=log_writer, name='log-writer', daemon=True).start()
+
+def log(message):
+    """Queue a log line for the background writer"""
+    LOG_QUEUE.put(f"{message}\n".encode())
+
 # Simple in-memory database
 DB_FILE = 'automation_service.db'
 
-def init_db():
-    """Initialize SQLite database"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+# Shared connection reused by every request instead of connecting per call
+DB = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+DB.execute('PRAGMA journal_mode=WAL')
+DB.execute('PRAGMA synchronous=NORMAL')
+DB.execute('PRAGMA temp_store=MEMORY')
+
+# SQLite allows a single writer at a time; hold this around writes to DB
+DB_WRITE_LOCK = threading.Lock()
+
+# bcrypt work factor; raise over time as hardware gets faster
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# bcrypt only uses the first 72 bytes of a password and raises on longer ones
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+# Checked against when the email is unknown, so a missing user costs the
+# same bcrypt work as a wrong password; computed once at import
+DUMMY_PASSWORD_HASH = bcrypt.hashpw(b'', bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+
+# Request and response schemas
+class LoginRequest(msgspec.Struct):
+    email: str
+    password: str
+
+class RegisterRequest(msgspec.Struct):
+    email: str
+    name: str
+
+class User(msgspec.Struct):
+    id: int
+    email: str
+    name: str
+    tenant_id: str
+    plan: str
+
+class LoginResponse(msgspec.Struct):
+    success: bool
+    user: User
+    token: str
+
+class RegisterResponse(msgspec.Struct):
+    success: bool
+    message: str
+    user: User
+
+class Plan(msgspec.Struct):
+    id: str
+    name: str
+    price: int
+    features: list[str]
+
+class PlansResponse(msgspec.Struct):
+    plans: list[Plan]
+
+class HealthResponse(msgspec.Struct):
+    status: str
+    timestamp: str
+    version: str
+    service: str
+
+# Decoders validate while parsing; they raise msgspec.DecodeError on bad input
+LOGIN_DECODER = msgspec.json.Decoder(LoginRequest)
+REGISTER_DECODER = msgspec.json.Decoder(RegisterRequest)
+WEBHOOK_DECODER = msgspec.json.Decoder()
+
+ENCODER = msgspec.json.Encoder()
+
+# Static responses, serialized once at import
+PLANS_JSON = ENCODER.encode(PlansResponse(plans=[
+    Plan(
+        id='starter',
+        name='Starter Automation',
+        price=29,
+        features=['1,000 conversations/month', 'Basic workflows', 'Email support']
+    ),
+    Plan(
+        id='pro',
+        name='Pro Automation',
+        price=99,
+        features=['5,000 conversations/month', 'Advanced workflows', 'Priority support', 'API access']
+    ),
+    Plan(
+        id='business',
+        name='Business Automation',
+        price=299,
+        features=['15,000 conversations/month', 'Custom workflows', 'Phone support', 'Advanced analytics']
+    )
+]))
+
+AUTH_URL_JSON = ENCODER.encode({
+    'authUrl': 'https://www.facebook.com/v18.0/dialog/oauth?client_id=demo_app_id&redirect_uri=http://localhost:3001/auth/callback&scope=whatsapp_business_management,whatsapp_business_messaging'
+})
+
+NOT_FOUND_JSON = ENCODER.encode({'error': 'Endpoint not found'})
+
+LOGIN_FAILED_JSON = ENCODER.encode({
+    'success': False,
+    'error': 'Invalid credentials'
+})
+
+CALLBACK_JSON = ENCODER.encode({
+    'success': True,
+    'message': 'WhatsApp connected successfully!',
+    'phone_number_id': 'demo_phone_id_12345'
+})
+
+MESSAGE_SENT_JSON = ENCODER.encode({
+    'success': True,
+    'messageId': 'msg_demo_12345',
+    'status': 'sent'
+})
+
+WEBHOOK_RECEIVED_JSON = ENCODER.encode({'status': 'received'})
+
+INVALID_REQUEST_JSON = ENCODER.encode({
+    'success': False,
+    'error': 'Invalid request body'
+})
+
+# Health payload is constant apart from the timestamp, which is spliced in
+HEALTH_JSON_HEAD, HEALTH_JSON_TAIL = ENCODER.encode(HealthResponse(
+    status='OK',
+    timestamp='__TIMESTAMP__',
+    version='1.0.0',
+    service='AutomationService Backend'
+)).split(b'__TIMESTAMP__')
+
+# (epoch second, formatted timestamp) so the formatting runs once per second
+_health_timestamp = (0, b'')
+
+def health_timestamp():
+    """Current UTC time as ISO-8601 bytes, reformatted at most once per second"""
+    global _health_timestamp
+    now = int(time.time())
+    if _health_timestamp[0] != now:
+        formatted = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        _health_timestamp = (now, formatted.encode())
+    return _health_timestamp[1]
+
+def hash_password(password):
+    """Hash a password with bcrypt and a fresh random salt"""
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+def verify_login(email, password):
+    """Return the user row if the credentials match, otherwise None"""
+    # Longer passwords can never have been hashed, and bcrypt would raise on
+    # them; rejected before the lookup so known and unknown emails look alike
+    if len(password) > BCRYPT_MAX_PASSWORD_BYTES:
+        return None
+    
+    row = DB.execute('''
+        SELECT id, email, password, name, tenant_id, plan
+        FROM users WHERE email = ?
+    ''', (email,)).fetchone()
+    if row is None:
+        bcrypt.checkpw(password, DUMMY_PASSWORD_HASH)
+        return None
     
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            name TEXT NOT NULL,
-            tenant_id TEXT NOT NULL,
-            plan TEXT DEFAULT 'starter',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    stored = row[2]
+    if stored.startswith('$2'):
+        return row if bcrypt.checkpw(password, stored.encode()) else None
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tenants (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            domain TEXT,
-            settings TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    # Legacy unsalted SHA-256 hash: verify it once, then upgrade to bcrypt
+    if not hmac.compare_digest(stored, hashlib.sha256(password).hexdigest()):
+        return None
+    upgraded = hash_password(password)
+    with DB_WRITE_LOCK:
+        DB.execute('UPDATE users SET password = ? WHERE id = ?', (upgraded, row[0]))
+    return row
+
+SCHEMA = '''
+    BEGIN;
+    
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        tenant_id TEXT NOT NULL,
+        plan TEXT DEFAULT 'starter',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE TABLE IF NOT EXISTS tenants (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        domain TEXT,
+        settings TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS whatsapp_accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tenant_id TEXT NOT NULL,
-            phone_number_id TEXT,
-            access_token TEXT,
-            business_id TEXT,
-            is_active BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (tenant_id) REFERENCES tenants (id)
-        )
-    ''')
+    CREATE TABLE IF NOT EXISTS whatsapp_accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant_id TEXT NOT NULL,
+        phone_number_id TEXT,
+        access_token TEXT,
+        business_id TEXT,
+        is_active BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tenant_id) REFERENCES tenants (id)
+    );
     
-    # Insert demo data
+    COMMIT;
+'''
+
+# Demo tenants: (id, name, domain, settings)
+TENANTS_SEED = [
+    ('tenant-demo', 'Demo Company', 'demo.automationservice.com', '{"theme": "blue", "timezone": "UTC"}'),
+]
+
+def init_db():
+    """Initialize SQLite database"""
+    # Create tables in a single script and transaction
+    DB.executescript(SCHEMA)
+    
+    # Insert demo data in one transaction, so seeding costs a single commit
+    cursor = DB.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
     cursor.execute('SELECT COUNT(*) FROM users')
     if cursor.fetchone()[0] == 0:
-        # Demo user
-        demo_password = hashlib.sha256('demo123'.encode()).hexdigest()
-        cursor.execute('''
+        # Demo users: (email, password, name, tenant_id, plan)
+        users_seed = [
+            ('demo@automationservice.com', hash_password(b'demo123'), 'Demo User', 'tenant-demo', 'pro'),
+        ]
+        cursor.executemany('''
             INSERT INTO users (email, password, name, tenant_id, plan)
             VALUES (?, ?, ?, ?, ?)
-        ''', ('demo@automationservice.com', demo_password, 'Demo User', 'tenant-demo', 'pro'))
+        ''', users_seed)
         
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO tenants (id, name, domain, settings)
             VALUES (?, ?, ?, ?)
-        ''', ('tenant-demo', 'Demo Company', 'demo.automationservice.com', '{"theme": "blue", "timezone": "UTC"}'))
-    
-    conn.commit()
-    conn.close()
+        ''', TENANTS_SEED)
+    cursor.execute('COMMIT')
 
 init_db()
 
-class AutomationServiceHandler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        """Handle preflight requests"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+# Route handlers take the raw request body (None for GET) and return the
+# serialized response payload; handlers that block may be coroutines
+def handle_health(data=None):
+    """GET /api/health"""
+    return HEALTH_JSON_HEAD + health_timestamp() + HEALTH_JSON_TAIL
+
+def handle_plans(data=None):
+    """GET /api/plans"""
+    return PLANS_JSON
+
+def handle_auth_connect(data=None):
+    """GET /api/auth/connect"""
+    return AUTH_URL_JSON
+
+async def handle_login(data=None):
+    """POST /api/auth/login"""
+    req = LOGIN_DECODER.decode(data)
     
-    def do_GET(self):
-        """Handle GET requests"""
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        if self.path == '/api/health':
-            response = {
-                'status': 'OK',
-                'timestamp': datetime.datetime.now().isoformat(),
-                'version': '1.0.0',
-                'service': 'AutomationService Backend'
-            }
-        elif self.path == '/api/plans':
-            response = {
-                'plans': [
-                    {
-                        'id': 'starter',
-                        'name': 'Starter Automation',
-                        'price': 29,
-                        'features': ['1,000 conversations/month', 'Basic workflows', 'Email support']
-                    },
-                    {
-                        'id': 'pro',
-                        'name': 'Pro Automation',
-                        'price': 99,
-                        'features': ['5,000 conversations/month', 'Advanced workflows', 'Priority support', 'API access']
-                    },
-                    {
-                        'id': 'business',
-                        'name': 'Business Automation',
-                        'price': 299,
-                        'features': ['15,000 conversations/month', 'Custom workflows', 'Phone support', 'Advanced analytics']
-                    }
-                ]
-            }
-        elif self.path == '/api/auth/connect':
-            response = {
-                'authUrl': 'https://www.facebook.com/v18.0/dialog/oauth?client_id=demo_app_id&redirect_uri=http://localhost:3001/auth/callback&scope=whatsapp_business_management,whatsapp_business_messaging'
-            }
-        else:
-            response = {'error': 'Endpoint not found'}
-        
-        self.wfile.write(json.dumps(response).encode())
+    # bcrypt is deliberately slow, so keep it off the event loop
+    row = await asyncio.to_thread(verify_login, req.email, req.password.encode())
+    if row is None:
+        return LOGIN_FAILED_JSON
     
-    def do_POST(self):
-        """Handle POST requests"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        
-        try:
-            data = json.loads(post_data.decode('utf-8'))
-        except:
-            data = {}
-        
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        if self.path == '/api/auth/login':
-            email = data.get('email')
-            password = data.get('password')
-            
-            # Demo authentication
-            if email == 'demo@automationservice.com' and password == 'demo123':
-                response = {
-                    'success': True,
-                    'user': {
-                        'id': 1,
-                        'email': 'demo@automationservice.com',
-                        'name': 'Demo User',
-                        'tenant_id': 'tenant-demo',
-                        'plan': 'pro'
-                    },
-                    'token': 'demo_jwt_token_12345'
-                }
-            else:
-                response = {
-                    'success': False,
-                    'error': 'Invalid credentials'
-                }
-        
-        elif self.path == '/api/auth/register':
-            response = {
-                'success': True,
-                'message': 'User registered successfully',
-                'user': {
-                    'id': 2,
-                    'email': data.get('email'),
-                    'name': data.get('name'),
-                    'tenant_id': 'tenant-new',
-                    'plan': 'starter'
-                }
-            }
-        
-        elif self.path == '/api/auth/callback':
-            response = {
-                'success': True,
-                'message': 'WhatsApp connected successfully!',
-                'phone_number_id': 'demo_phone_id_12345'
-            }
-        
-        elif self.path == '/api/messages/send':
-            response = {
-                'success': True,
-                'messageId': 'msg_demo_12345',
-                'status': 'sent'
-            }
-        
-        elif self.path == '/webhook/whatsapp':
-            # Simulate WhatsApp webhook
-            response = {'status': 'received'}
-            
-            # Send to n8n (simulated)
-            print(f"Message sent to n8n: {data}")
-        
-        else:
-            response = {'error': 'Endpoint not found'}
-        
-        self.wfile.write(json.dumps(response).encode())
+    user_id, email, _, name, tenant_id, plan = row
+    return ENCODER.encode(LoginResponse(
+        success=True,
+        user=User(id=user_id, email=email, name=name, tenant_id=tenant_id, plan=plan),
+        token='demo_jwt_token_12345'
+    ))
+
+def handle_register(data=None):
+    """POST /api/auth/register"""
+    req = REGISTER_DECODER.decode(data)
+    return ENCODER.encode(RegisterResponse(
+        success=True,
+        message='User registered successfully',
+        user=User(id=2, email=req.email, name=req.name, tenant_id='tenant-new', plan='starter')
+    ))
+
+def handle_auth_callback(data=None):
+    """POST /api/auth/callback"""
+    return CALLBACK_JSON
+
+def handle_send_message(data=None):
+    """POST /api/messages/send"""
+    return MESSAGE_SENT_JSON
+
+def handle_whatsapp_webhook(data=None):
+    """POST /webhook/whatsapp"""
+    # Send to n8n (simulated)
+    log(f"Message sent to n8n: {WEBHOOK_DECODER.decode(data)}")
+    return WEBHOOK_RECEIVED_JSON
+
+def handle_not_found(data=None):
+    """Fallback for unknown paths"""
+    return NOT_FOUND_JSON
+
+GET_ROUTES = {
+    '/api/health': handle_health,
+    '/api/plans': handle_plans,
+    '/api/auth/connect': handle_auth_connect,
+}
+
+POST_ROUTES = {
+    '/api/auth/login': handle_login,
+    '/api/auth/register': handle_register,
+    '/api/auth/callback': handle_auth_callback,
+    '/api/messages/send': handle_send_message,
+    '/webhook/whatsapp': handle_whatsapp_webhook,
+}
+
+async def read_body(receive):
+    """Collect the full request body from the ASGI receive channel"""
+    # Small JSON bodies arrive in a single message; return it without copying
+    message = await receive()
+    body = message.get('body', b'')
+    if not message.get('more_body', False):
+        return body
     
-    def log_message(self, format, *args):
-        """Custom log message"""
-        print(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {format % args}")
+    chunks = [body]
+    while message.get('more_body', False):
+        message = await receive()
+        chunks.append(message.get('body', b''))
+    return b''.join(chunks)
+
+# Headers shared by every JSON response; only content-length is per request
+JSON_HEADERS = (
+    (b'content-type', b'application/json'),
+    (b'access-control-allow-origin', b'*'),
+)
+
+# Preflight responses never vary, so the ASGI messages are built once
+PREFLIGHT_START = {
+    'type': 'http.response.start',
+    'status': 204,
+    'headers': [
+        (b'access-control-allow-origin', b'*'),
+        (b'access-control-allow-methods', b'GET, POST, PUT, DELETE, OPTIONS'),
+        (b'access-control-allow-headers', b'Content-Type, Authorization'),
+    ],
+}
+PREFLIGHT_BODY = {'type': 'http.response.body', 'body': b''}
+
+async def send_payload(send, payload, status=200):
+    """Send an already serialized JSON payload as one header block and one body"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [*JSON_HEADERS, (b'content-length', b'%d' % len(payload))],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+async def app(scope, receive, send):
+    """ASGI application dispatching on method and path"""
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    path = scope['path']
+
+    if method == 'OPTIONS':
+        # Handle preflight requests
+        await send(PREFLIGHT_START)
+        await send(PREFLIGHT_BODY)
+        return
+
+    if method == 'GET':
+        await send_payload(send, GET_ROUTES.get(path, handle_not_found)())
+        return
+
+    if method == 'POST':
+        post_data = await read_body(receive)
+
+        try:
+            payload = POST_ROUTES.get(path, handle_not_found)(post_data)
+            if asyncio.iscoroutine(payload):
+                payload = await payload
+        except msgspec.DecodeError:
+            await send_payload(send, INVALID_REQUEST_JSON, status=400)
+            return
+
+        await send_payload(send, payload)
+        return
+
+    await send_payload(send, NOT_FOUND_JSON)
 
 def run_server():
-    """Run the HTTP server"""
-    server_address = ('', 3002)
-    httpd = HTTPServer(server_address, AutomationServiceHandler)
+    """Run the ASGI server under uvicorn with uvloop and httptools"""
     print("🚀 AutomationService Backend running on http://localhost:3002")
     print("📊 Health check: http://localhost:3002/api/health")
     print("🔐 Demo login: demo@automationservice.com / demo123")
-    httpd.serve_forever()
+    uvicorn.run(
+        'backend_server:app',
+        host='0.0.0.0',
+        port=3002,
+        loop='uvloop',
+        http='httptools',
+        workers=os.cpu_count(),
+        # Deep accept queue so bursts of parallel requests are not dropped
+        backlog=4096,
+        # Keep idle connections open long enough for polling clients to reuse them
+        timeout_keep_alive=30,
+    )
 
 if __name__ == '__main__':
     run_server()
\ No newline at end of file
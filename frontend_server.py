@@ -3,42 +3,181 @@
 Simple HTTP Server for AutomationService Frontend
 """
 
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import gzip
+import mimetypes
 import os
+import tempfile
 
-class AutomationServiceFrontendHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory="frontend", **kwargs)
+import brotli
+import uvicorn
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.responses import FileResponse
+from starlette.routing import Mount
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+FRONTEND_DIR = 'frontend'
+
+# Text assets that get precompressed sidecar files
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.svg')
+
+# (Content-Encoding, sidecar suffix, compressor), in order of preference
+SIDECARS = (
+    ('br', '.br', lambda data: brotli.compress(data, quality=11)),
+    ('gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0)),
+)
+
+def precompress(directory):
+    """Write .br/.gz sidecars for text assets whose sidecar is missing or stale"""
+    for root, dirs, files in os.walk(directory):
+        # Only our own assets: not installed packages or hidden directories
+        dirs[:] = [d for d in dirs if d != 'node_modules' and not d.startswith('.')]
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            mtime = os.path.getmtime(path)
+            data = None
+            for _, suffix, compress in SIDECARS:
+                sidecar = path + suffix
+                if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= mtime:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                # Write to a private temp file then rename, so a worker never serves
+                # a half-written sidecar and concurrent workers never share a file
+                fd, tmp = tempfile.mkstemp(dir=root, prefix=name, suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(compress(data))
+                    os.chmod(tmp, 0o644)
+                    os.replace(tmp, sidecar)
+                except OSError:
+                    # A worker that loses the race, or cannot write here, leaves the
+                    # sidecar to whoever wins; the original file is still served
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+
+precompress(FRONTEND_DIR)
+
+def accepted_encodings(accept_encoding):
+    """Content codings listed in an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for token in accept_encoding.split(','):
+        coding, *params = token.split(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+class FrontendStaticFiles(StaticFiles):
+    """StaticFiles with SPA routing, precompressed sidecars and long-lived /static/ caching"""
     
-    def do_GET(self):
-        # Serve index.html for all routes (SPA support)
-        if self.path != '/' and not self.path.startswith('/static') and not '.' in self.path:
-            self.path = '/'
+    async def get_response(self, path, scope):
+        # Serve index.html for all routes (SPA support); a route is any path
+        # outside /static whose last segment has no file extension
+        route = scope['path']
+        if route != '/' and not route.startswith('/static') and '.' not in route.rpartition('/')[2]:
+            path = 'index.html'
+        return await super().get_response(path, scope)
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        headers = {}
+        media_type = None
+        
+        # Static assets are fingerprinted, so browsers can cache them forever
+        if scope['path'].startswith('/static/'):
+            headers['Cache-Control'] = 'public, max-age=31536000, immutable'
         
-        # Add CORS headers
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        # Serve a precompressed sidecar when the client accepts its encoding
+        if str(full_path).endswith(PRECOMPRESS_EXTENSIONS):
+            headers['Vary'] = 'Accept-Encoding'
+            accepted = accepted_encodings(request_headers.get('accept-encoding', ''))
+            for encoding, suffix, _ in SIDECARS:
+                sidecar = f'{full_path}{suffix}'
+                if encoding in accepted and os.path.exists(sidecar):
+                    # A sidecar has the content type of the file it compresses
+                    media_type = mimetypes.guess_type(full_path)[0]
+                    headers['Content-Encoding'] = encoding
+                    full_path, stat_result = sidecar, os.stat(sidecar)
+                    break
         
-        super().do_GET()
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+# CORS headers added to every response, whatever the request's Origin
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-methods', b'GET, POST, PUT, DELETE, OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type, Authorization'),
+]
+
+# Preflight responses never vary, so the ASGI messages are built once
+PREFLIGHT_START = {'type': 'http.response.start', 'status': 204, 'headers': CORS_HEADERS}
+PREFLIGHT_BODY = {'type': 'http.response.body', 'body': b''}
+
+class CORSHeadersMiddleware:
+    """Answer every OPTIONS request with 204 and add the CORS headers to all other responses"""
+    
+    def __init__(self, app):
+        self.app = app
     
-    def do_OPTIONS(self):
-        """Handle preflight requests"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        if scope['method'] == 'OPTIONS':
+            await send(PREFLIGHT_START)
+            await send(PREFLIGHT_BODY)
+            return
+        
+        async def send_with_cors(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', ()), *CORS_HEADERS]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+
+app = Starlette(
+    routes=[Mount('/', app=FrontendStaticFiles(directory=FRONTEND_DIR, html=True))],
+    middleware=[Middleware(CORSHeadersMiddleware)],
+)
 
 def run_frontend_server():
-    """Run the frontend HTTP server"""
-    server_address = ('', 8000)
-    httpd = HTTPServer(server_address, AutomationServiceFrontendHandler)
+    """Run the frontend under uvicorn with uvloop and httptools"""
     print("🎨 AutomationService Frontend running on http://localhost:8000")
     print("🌐 Access your dashboard: http://localhost:8000")
     print("🔗 Backend API: http://localhost:3002")
-    httpd.serve_forever()
+    uvicorn.run(
+        'frontend_server:app',
+        host='0.0.0.0',
+        port=8000,
+        loop='uvloop',
+        http='httptools',
+        workers=os.cpu_count(),
+        # Deep accept queue so bursts of parallel asset requests are not dropped
+        backlog=4096,
+    )
 
 if __name__ == '__main__':
-    run_frontend_server()
\ No newline at end of file
+    run_frontend_server()